@@ -1,76 +1,310 @@
 import os
-from sentence_transformers import SentenceTransformer, util
+import re
+import atexit
+import contextlib
+import hashlib
+import functools
+import mmap
+import tempfile
+import numpy as np
+import torch
 import sys
 
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+_MODEL = None
+_MODEL_NAME = None
+_POOL = None
+_CACHE_DIR = "cache"
+_CLAUSE_RE = re.compile(r"\n\s*\n\s*")
+_PAGE_MARKER_RE = re.compile(r"^--- Page \d+ Text ---$", re.MULTILINE)
+_MIN_CLAUSE_CHARS = 40
+_MIN_CLAUSE_WORDS = 6
+# Below this many clauses, starting the worker pool (one process per core,
+# each importing torch and a copy of the model) costs more than it saves
+_MULTI_PROCESS_MIN_CLAUSES = 1000
+
+def _load_model(name, device):
+    """
+    Loads a SentenceTransformer model for the given device. The model runs in
+    fp16 on GPU and with int8-quantized linear layers on CPU; the 0.4
+    similarity threshold does not need fp32 precision.
+    """
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(name, device=device)
+    if device == "cuda":
+        model.half()
+    else:
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def get_model(name="all-MiniLM-L6-v2"):
+    """
+    Returns the shared SentenceTransformer model, loading it on first use.
+    """
+    global _MODEL, _MODEL_NAME
+    if _MODEL is None:
+        _MODEL = _load_model(name, DEVICE)
+        _MODEL_NAME = name
+    return _MODEL
+
+def _pool_worker(name, input_queue, results_queue):
+    """
+    Entry point for a CPU pool worker. A dynamically quantized model cannot
+    be sent to a spawned process, so each worker loads and quantizes its own
+    copy by name, then serves encode requests from the queue.
+    """
+    # One worker per core, so a single thread each avoids oversubscription
+    torch.set_num_threads(1)
+    model = _load_model(name, "cpu")
+    model._encode_multi_process_worker("cpu", model, input_queue, results_queue)
+
+def get_pool():
+    """
+    Returns the persistent multi-process encoding pool, with one CPU worker
+    per core, starting it on first use. The pool has the same layout as
+    SentenceTransformer.start_multi_process_pool, so encode_multi_process
+    and stop_multi_process_pool work with it. The pool is stopped at exit.
+    """
+    global _POOL
+    if _POOL is None:
+        ctx = torch.multiprocessing.get_context("spawn")
+        input_queue = ctx.Queue()
+        output_queue = ctx.Queue()
+        processes = []
+        for _ in range(os.cpu_count() or 1):
+            p = ctx.Process(target=_pool_worker, args=(_MODEL_NAME, input_queue, output_queue), daemon=True)
+            p.start()
+            processes.append(p)
+        _POOL = {"input": input_queue, "output": output_queue, "processes": processes}
+        atexit.register(get_model().stop_multi_process_pool, _POOL)
+    return _POOL
+
+@functools.lru_cache(maxsize=8)
+def _read_text(file_path: str, mtime: float) -> str:
+    """
+    Reads a file's text through a read-only memory map, normalizing line
+    endings to \n as a text-mode read would. Cached on (path, mtime) so
+    edits invalidate the entry.
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:].decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
 def load_text(file_path: str) -> str:
     """
     Loads text from a file.
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        return f.read()
+    return _read_text(file_path, os.path.getmtime(file_path))
 
 def extract_clauses(text: str) -> list:
     """
     Splits a document's text into clauses. Here, we assume that clauses
-    are separated by two newline characters.
+    are separated by a blank line. The separator starts at a newline and
+    absorbs the whitespace after it, so each piece only needs an rstrip.
+    Parser page markers are removed and fragments too short to be a clause
+    (headings, page numbers, OCR noise) are dropped before encoding.
     """
-    clauses = [clause.strip() for clause in text.split("\n\n") if clause.strip()]
-    return clauses
+    text = _PAGE_MARKER_RE.sub("", text)
+    clauses = (clause.rstrip() for clause in _CLAUSE_RE.split(text.strip()))
+    return [
+        clause for clause in clauses
+        if len(clause) >= _MIN_CLAUSE_CHARS and len(clause.split()) >= _MIN_CLAUSE_WORDS
+    ]
 
 def encode_text(model, text, is_multiple_texts=False):
     """
-    Encodes text using the provided model.
+    Encodes text using the provided model into unit-length embeddings. Lists
+    of texts are encoded in batches; the model sorts them by length internally
+    so each batch pads to similar-length inputs.
+    """
+    if is_multiple_texts:
+        return model.encode(text, batch_size=64, convert_to_tensor=True, device=DEVICE,
+                            normalize_embeddings=True, show_progress_bar=False)
+    return model.encode(text, convert_to_tensor=True, device=DEVICE, normalize_embeddings=True)
+
+def encode_text_multi_process(model, texts):
+    """
+    Encodes a list of texts across the CPU worker pool into unit-length
+    embeddings.
     """
-    return model.encode(text, convert_to_tensor=True)
+    embeddings = model.encode_multi_process(texts, get_pool(), batch_size=64)
+    return torch.nn.functional.normalize(torch.from_numpy(embeddings), dim=-1)
+
+def encode_clauses(model, clauses: list, multi_process=False):
+    """
+    Encodes a list of clauses, running each distinct clause through the model
+    only once. Boilerplate repeated across documents is common in regulatory
+    sets, so duplicates are mapped back onto the shared embedding. With
+    multi_process, large batches go through the CPU worker pool; small ones
+    are still encoded in-process.
+    """
+    index = {}
+    index_map = [index.setdefault(clause, len(index)) for clause in clauses]
+    unique_clauses = list(index)
+    if multi_process and len(unique_clauses) >= _MULTI_PROCESS_MIN_CLAUSES:
+        embeddings = encode_text_multi_process(model, unique_clauses)
+    else:
+        embeddings = encode_text(model, unique_clauses, is_multiple_texts=True)
+    return embeddings[torch.tensor(index_map, device=embeddings.device)]
 
 def calculate_similarity(sop_embedding, clause_embeddings):
     """
     Calculates cosine similarity between SOP embedding and clause embeddings.
+    Both are normalized at encode time, so this is a plain dot product.
     """
-    return util.cos_sim(sop_embedding, clause_embeddings)[0]
+    clause_embeddings = clause_embeddings.to(sop_embedding)
+    if sop_embedding.is_cuda:
+        return clause_embeddings @ sop_embedding
+    # On CPU, a direct NumPy matrix-vector product goes straight to BLAS
+    # without torch's dispatch overhead
+    return torch.from_numpy(clause_embeddings.numpy() @ sop_embedding.numpy())
 
-def find_relevant_clauses(sop_text: str, clauses: list, model, threshold=0.4) -> list:
+def clause_cache_path(clauses: list) -> str:
     """
-    Compares each clause from the regulatory document to the entire SOP text.
-    Returns a list of tuples containing the clause and its similarity score if
-    the score is above the threshold.
+    Returns the on-disk cache path for a document's clause embeddings, keyed
+    on a hash of the clauses themselves and of the model and device that
+    produce the vectors (fp16 on GPU, int8 on CPU).
     """
-    relevant = []
-    sop_embedding = encode_text(model, sop_text)
-    clause_embeddings = encode_text(model, clauses, is_multiple_texts=True)
+    key = hashlib.blake2b("\0".join([_MODEL_NAME or "", DEVICE, *clauses]).encode("utf-8")).hexdigest()
+    return os.path.join(_CACHE_DIR, f"{key}.npz")
+
+def load_cached_embeddings(cache_path: str):
+    """
+    Loads cached clause embeddings, or returns None if there is no usable
+    cache entry. An entry that fails to load is treated as a miss.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with np.load(cache_path) as data:
+            return torch.from_numpy(data["emb"]).float()
+    except Exception as e:
+        print(f"Ignoring unreadable cache entry '{cache_path}': {e}")
+        return None
+
+def save_cached_embeddings(cache_path: str, embeddings) -> None:
+    """
+    Saves clause embeddings to the on-disk cache in fp16. The entry is written
+    to a temporary file first and moved into place, so a crash or a concurrent
+    writer never leaves a truncated file behind. The cache is only an
+    optimization, so a failed write is reported and otherwise ignored.
+    """
+    tmp_path = None
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=_CACHE_DIR, suffix=".npz.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, emb=embeddings.half().cpu().numpy())
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+    except OSError as e:
+        print(f"Could not write cache entry '{cache_path}': {e}")
+    finally:
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+
+def get_clause_embeddings(model, clauses: list):
+    """
+    Returns embeddings for a document's clauses, encoding and caching them
+    only if they are not already cached on disk.
+    """
+    cache_path = clause_cache_path(clauses)
+    clause_embeddings = load_cached_embeddings(cache_path)
+    if clause_embeddings is None:
+        clause_embeddings = encode_clauses(model, clauses)
+        save_cached_embeddings(cache_path, clause_embeddings)
+    return clause_embeddings
+
+def find_relevant_clauses(sop_embedding, clauses: list, model, threshold=0.4) -> list:
+    """
+    Compares each clause from the regulatory document to the pre-computed SOP
+    embedding. Returns a list of tuples containing the clause and its similarity
+    score if the score is above the threshold.
+    """
+    if not clauses:
+        return []
+    clause_embeddings = get_clause_embeddings(model, clauses)
     
     # Compute cosine similarity between the SOP and each clause
     cosine_scores = calculate_similarity(sop_embedding, clause_embeddings)
     
-    for clause, score in zip(clauses, cosine_scores):
-        if score >= threshold:
-            relevant.append((clause, float(score)))
-    return relevant
+    return filter_by_threshold(clauses, scores_to_numpy(cosine_scores), threshold)
 
-def process_single_regulatory_doc(sop_text, reg_file_path, model):
+def scores_to_numpy(cosine_scores) -> np.ndarray:
+    """
+    Copies a score tensor to the host as a NumPy array in one bulk transfer.
+    """
+    return cosine_scores.detach().cpu().numpy()
+
+def filter_by_threshold(clauses: list, scores: np.ndarray, threshold=0.4) -> list:
+    """
+    Returns (clause, score) tuples for the clauses whose score is above the threshold.
+    Scores are a host-side NumPy array; only the survivors become Python floats.
+    """
+    idx = np.nonzero(scores >= threshold)[0]
+    return [(clauses[i], score) for i, score in zip(idx, scores[idx].tolist())]
+
+def process_single_regulatory_doc(sop_embedding, reg_file_path, model):
     """
     Processes a single regulatory document and finds clauses relevant to the SOP.
     """
     regulatory_text = load_text(reg_file_path)
     clauses = extract_clauses(regulatory_text)
-    return find_relevant_clauses(sop_text, clauses, model)
+    return find_relevant_clauses(sop_embedding, clauses, model)
 
 def process_regulatory_docs(sop_file: str, regulatory_docs_folder: str):
     """
-    Processes all regulatory documents in the specified folder. For each document,
-    it extracts clauses and finds those relevant to the SOP.
+    Processes all regulatory documents in the specified folder. Clauses from
+    every document without cached embeddings are encoded together in a single
+    batch, then the scores are split back per document to find those relevant
+    to the SOP.
     """
-    model = SentenceTransformer("all-MiniLM-L6-v2")
+    model = get_model()
     sop_text = load_text(sop_file)
+    sop_embedding = encode_text(model, sop_text)
     
-    all_relevant_clauses = []
+    # Collect clauses from every document, remembering where each one starts
+    filenames = []
+    all_clauses = []
+    offsets = [0]
+    with os.scandir(regulatory_docs_folder) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith("_extracted.txt"):
+                clauses = extract_clauses(load_text(entry.path))
+                if clauses:
+                    all_clauses.extend(clauses)
+                    filenames.append(entry.name)
+                    offsets.append(len(all_clauses))
+    
+    if not all_clauses:
+        return []
+    
+    # Reuse cached embeddings and encode every remaining clause in one batch
+    cache_paths = [clause_cache_path(all_clauses[offsets[i]:offsets[i + 1]]) for i in range(len(filenames))]
+    doc_embeddings = [load_cached_embeddings(path) for path in cache_paths]
+    missing = [i for i, embeddings in enumerate(doc_embeddings) if embeddings is None]
+    uncached_clauses = [clause for i in missing for clause in all_clauses[offsets[i]:offsets[i + 1]]]
+    if uncached_clauses:
+        new_embeddings = encode_clauses(model, uncached_clauses, multi_process=DEVICE != "cuda")
+        start = 0
+        for i in missing:
+            end = start + offsets[i + 1] - offsets[i]
+            doc_embeddings[i] = new_embeddings[start:end]
+            save_cached_embeddings(cache_paths[i], doc_embeddings[i])
+            start = end
     
-    for filename in os.listdir(regulatory_docs_folder):
-        if filename.lower().endswith("_extracted.txt"):
-            file_path = os.path.join(regulatory_docs_folder, filename)
-            relevant_clauses = process_single_regulatory_doc(sop_text, file_path, model)
-            if relevant_clauses:
-                all_relevant_clauses.append((filename, relevant_clauses))
+    clause_embeddings = torch.cat([embeddings.to(sop_embedding) for embeddings in doc_embeddings])
+    cosine_scores = scores_to_numpy(calculate_similarity(sop_embedding, clause_embeddings))
+    
+    all_relevant_clauses = []
+    for i, filename in enumerate(filenames):
+        start, end = offsets[i], offsets[i + 1]
+        relevant_clauses = filter_by_threshold(all_clauses[start:end], cosine_scores[start:end])
+        if relevant_clauses:
+            all_relevant_clauses.append((filename, relevant_clauses))
     return all_relevant_clauses
 
 def print_relevant_clauses(doc_name, clauses):
@@ -101,6 +335,6 @@ def process_specific_reg_file(sop_file, reg_file_path):
         print(f"Regulatory file '{reg_file_path}' not found!")
         return None
         
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    sop_text = load_text(sop_file)
-    return process_single_regulatory_doc(sop_text, reg_file_path, model)
\ No newline at end of file
+    model = get_model()
+    sop_embedding = encode_text(model, load_text(sop_file))
+    return process_single_regulatory_doc(sop_embedding, reg_file_path, model)
\ No newline at end of file
@@ -1,10 +1,25 @@
 import os
 import sys
 import json
-import anthropic
+import concurrent.futures
 from datetime import datetime
 from comparison import load_text, process_specific_reg_file, process_regulatory_docs, extract_clauses
 
+_CLIENT = None
+
+def get_client():
+    """
+    Returns the shared Anthropic client, creating it on first use.
+    
+    Returns:
+        anthropic.Anthropic: The client, authenticated from ANTHROPIC_API_KEY
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        import anthropic
+        _CLIENT = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    return _CLIENT
+
 def create_prompt(sop_text, relevant_clauses, reg_name):
     """
     Creates a prompt for Claude to analyze the SOP against regulatory clauses.
@@ -41,7 +56,8 @@ Format your analysis as a professional compliance report with clear sections and
 
 def generate_report_with_claude(prompt, max_tokens=4000):
     """
-    Generate a compliance report using Claude.
+    Generate a compliance report using Claude. The response is streamed so
+    the connection stays active for long reports.
     
     Args:
         prompt (str): The prompt for Claude
@@ -51,14 +67,14 @@ def generate_report_with_claude(prompt, max_tokens=4000):
         str: The generated report
     """
     try:
-        message = client.messages.create(
+        with get_client().messages.stream(
             model="claude-3-5-sonnet-20240620",
             max_tokens=max_tokens,
             messages=[
                 {"role": "user", "content": prompt}
             ]
-        )
-        return message.content[0].text
+        ) as stream:
+            return stream.get_final_text()
     except Exception as e:
         print(f"Error generating report with Claude: {e}")
         return f"Error: {str(e)}"
@@ -127,16 +143,44 @@ def analyze_specific_regulation(sop_file, reg_file_path):
     
     return report_path
 
-def analyze_all_regulations(sop_file, regulatory_folder):
+def _generate_and_save_report(sop_text, clauses, doc_name):
+    """
+    Generates and saves the compliance report for one regulatory document.
+    Runs in a worker thread of analyze_all_regulations.
+    
+    Args:
+        sop_text (str): The text of the SOP document
+        clauses (list): List of (clause, score) tuples from the regulatory document
+        doc_name (str): Name of the regulatory document
+        
+    Returns:
+        str: Path to the saved report
+    """
+    # Create the prompt
+    prompt = create_prompt(sop_text, clauses, doc_name)
+    
+    # Generate the report
+    print(f"Generating compliance report for {doc_name}...")
+    report = generate_report_with_claude(prompt)
+    
+    # Save the report
+    report_path = save_report(report, doc_name)
+    print(f"Report saved to {report_path}")
+    return report_path
+
+def analyze_all_regulations(sop_file, regulatory_folder, max_workers=4):
     """
     Analyzes all regulatory files in the specified folder against the SOP.
+    Reports are generated concurrently, since each Claude call spends most
+    of its time waiting on the API, and saved as they complete.
     
     Args:
         sop_file (str): Path to the SOP file
         regulatory_folder (str): Path to the folder containing regulatory files
+        max_workers (int): Maximum number of concurrent Claude requests
         
     Returns:
-        list: Paths to all saved reports
+        list: Paths to all saved reports, in document order
     """
     # Process all regulatory documents
     results = process_regulatory_docs(sop_file, regulatory_folder)
@@ -148,18 +192,12 @@ def analyze_all_regulations(sop_file, regulatory_folder):
     # Load the SOP text
     sop_text = load_text(sop_file)
     
-    report_paths = []
-    for doc_name, clauses in results:
-        # Create the prompt
-        prompt = create_prompt(sop_text, clauses, doc_name)
-        
-        # Generate the report
-        print(f"Generating compliance report for {doc_name}...")
-        report = generate_report_with_claude(prompt)
-        
-        # Save the report
-        report_path = save_report(report, doc_name)
-        print(f"Report saved to {report_path}")
-        report_paths.append(report_path)
+    # Create the shared client up front so the worker threads don't race to build it
+    get_client()
     
-    return report_paths
\ No newline at end of file
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_generate_and_save_report, sop_text, clauses, doc_name)
+            for doc_name, clauses in results
+        ]
+        return [future.result() for future in futures]
\ No newline at end of file
@@ -1,21 +1,18 @@
 import os
-import gradio as gr
-import anthropic
 from datetime import datetime
-from comparison import load_text, process_specific_reg_file
+from comparison import get_model, load_text, process_specific_reg_file
 from inference import create_prompt, generate_report_with_claude, save_report
 
-# Initialize the Anthropic client with your API key
-client = anthropic.Anthropic(
-    # Remove this line in production and use environment variables instead
-    api_key=os.environ.get("ANTHROPIC_API_KEY")
-)
+# Load the embedding model once at startup rather than on every request
+get_model()
 
 def get_available_regulations():
     """Get list of available regulation files"""
     reg_folder = os.path.join("parsed", "regulations")
     if os.path.isdir(reg_folder):
-        return [f for f in os.listdir(reg_folder) if f.endswith("_extracted.txt")]
+        with os.scandir(reg_folder) as entries:
+            return [entry.name for entry in entries
+                    if entry.is_file() and entry.name.endswith("_extracted.txt")]
     return []
 
 def analyze_regulation(reg_file):
@@ -52,25 +49,29 @@ def analyze_regulation(reg_file):
     
     return f"Analysis complete! Report saved to {report_path}\n\n{report}"
 
-# Create the Gradio interface
-with gr.Blocks(title="Regulatory Compliance Analysis System") as demo:
-    gr.Markdown("# Regulatory Compliance Analysis System")
-    
-    gr.Markdown("## Select a Regulation to Analyze Against Standard SOP")
-    reg_dropdown = gr.Dropdown(
-        choices=get_available_regulations(),
-        label="Select Regulatory Document"
-    )
-    
-    analyze_btn = gr.Button("Analyze Regulation")
-    result = gr.Textbox(label="Analysis Result", lines=20)
-    
-    analyze_btn.click(
-        fn=analyze_regulation,
-        inputs=reg_dropdown,
-        outputs=result
-    )
+def build_interface():
+    """Create the Gradio interface"""
+    import gradio as gr
+
+    with gr.Blocks(title="Regulatory Compliance Analysis System") as demo:
+        gr.Markdown("# Regulatory Compliance Analysis System")
+        
+        gr.Markdown("## Select a Regulation to Analyze Against Standard SOP")
+        reg_dropdown = gr.Dropdown(
+            choices=get_available_regulations(),
+            label="Select Regulatory Document"
+        )
+        
+        analyze_btn = gr.Button("Analyze Regulation")
+        result = gr.Textbox(label="Analysis Result", lines=20)
+        
+        analyze_btn.click(
+            fn=analyze_regulation,
+            inputs=reg_dropdown,
+            outputs=result
+        )
+    return demo
 
 # Launch the app
 if __name__ == "__main__":
-    demo.launch()
\ No newline at end of file
+    build_interface().launch()
\ No newline at end of file
@@ -1,14 +1,44 @@
 import os
 import sys
-import fitz  # PyMuPDF for PDF processing
-import pytesseract
-from PIL import Image
-import io
-from docx import Document
+import concurrent.futures
+
+SUPPORTED_EXTENSIONS = {".pdf", ".docx"}
+
+def _ocr_page(page) -> str:
+    """
+    Extracts text from an image-only PDF page using OCR. The OCR libraries
+    are imported here so that their startup cost is only paid when a page
+    actually has no text layer.
+
+    Args:
+        page (fitz.Page): The PDF page to render and OCR.
+
+    Returns:
+        str: The text recognized on the page.
+    """
+    import io
+    import pytesseract
+    from PIL import Image
+
+    try:
+        image = Image.open(io.BytesIO(page.get_pixmap(dpi=300).tobytes("png")))
+        return pytesseract.image_to_string(image)
+    except Exception as e:
+        print(f"Error running OCR on page {page.number + 1}: {e}")
+        return ""
+
+def _page_text(page) -> str:
+    """
+    Returns a page's text layer, falling back to OCR for pages without one.
+    """
+    page_text = page.get_text()
+    if not page_text.strip():
+        page_text = _ocr_page(page)
+    return page_text
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
-    Extracts text from a PDF file, including text within images using OCR.
+    Extracts text from a PDF file, using OCR for pages that contain only images.
 
     Args:
         pdf_path (str): The file path to the PDF.
@@ -16,20 +46,18 @@ def extract_text_from_pdf(pdf_path: str) -> str:
     Returns:
         str: The combined text extracted from the PDF.
     """
+    import fitz  # PyMuPDF for PDF processing
+
     try:
         doc = fitz.open(pdf_path)
     except Exception as e:
         print(f"Error opening PDF '{pdf_path}': {e}")
         return ""
 
-    full_text = ""
-    for page_number in range(len(doc)):
-        page = doc[page_number]
-        full_text += f"\n--- Page {page_number + 1} Text ---\n"
-        page_text = page.get_text()
-        full_text += page_text
-    
-    return full_text
+    return "".join(
+        f"\n--- Page {page_number + 1} Text ---\n{_page_text(page)}"
+        for page_number, page in enumerate(doc)
+    )
 
 def extract_text_from_docx(docx_path: str) -> str:
     """
@@ -41,23 +69,45 @@ def extract_text_from_docx(docx_path: str) -> str:
     Returns:
         str: The combined text extracted from the DOCX.
     """
+    from docx import Document
+
     try:
         doc = Document(docx_path)
     except Exception as e:
         print(f"Error opening DOCX '{docx_path}': {e}")
         return ""
 
-    full_text = ""
-    for para in doc.paragraphs:
-        full_text += para.text + "\n"
-    
-    return full_text
+    return "".join(f"{para.text}\n" for para in doc.paragraphs)
+
+def _extract_one(task: tuple) -> None:
+    """
+    Extracts the text from a single file and saves it to its output path.
+
+    Args:
+        task (tuple): (input_file_path, kind, output_file), where kind is
+                      either "pdf" or "docx".
+    """
+    input_file_path, kind, output_file = task
+    if kind == "pdf":
+        print(f"Processing PDF: {input_file_path} ...")
+        extracted_text = extract_text_from_pdf(input_file_path)
+    else:
+        print(f"Processing DOCX: {input_file_path} ...")
+        extracted_text = extract_text_from_docx(input_file_path)
+
+    try:
+        with open(output_file, "w", encoding="utf-8") as out_file:
+            out_file.write(extracted_text)
+        print(f"Saved extracted text to: {output_file}\n")
+    except Exception as e:
+        print(f"Error saving output for '{input_file_path}': {e}")
 
 def process_all_files(root_dir: str = ".") -> None:
     """
     Recursively processes all PDF and DOCX files under the root directory.
     Extracted text from each file is stored in a 'parsed/' directory,
-    preserving the relative directory structure.
+    preserving the relative directory structure. Files are extracted in
+    parallel across a process pool.
 
     Args:
         root_dir (str): The root directory to search for files.
@@ -67,19 +117,15 @@ def process_all_files(root_dir: str = ".") -> None:
     # Ensure the output root directory exists
     os.makedirs(output_root, exist_ok=True)
 
-    # Walk through the root directory recursively
+    # Walk through the root directory recursively, collecting files to extract
+    tasks = []
     for dirpath, _, filenames in os.walk(root_dir):
         for filename in filenames:
-            if filename.lower().endswith(".pdf"):
-                input_file_path = os.path.join(dirpath, filename)
-                print(f"Processing PDF: {input_file_path} ...")
-                extracted_text = extract_text_from_pdf(input_file_path)
-            elif filename.lower().endswith(".docx"):
-                input_file_path = os.path.join(dirpath, filename)
-                print(f"Processing DOCX: {input_file_path} ...")
-                extracted_text = extract_text_from_docx(input_file_path)
-            else:
+            extension = os.path.splitext(filename)[1].lower()
+            if extension not in SUPPORTED_EXTENSIONS:
                 continue
+            kind = extension[1:]
+            input_file_path = os.path.join(dirpath, filename)
 
             # Compute the relative path to preserve directory structure
             relative_dir = os.path.relpath(dirpath, root_dir)
@@ -88,12 +134,10 @@ def process_all_files(root_dir: str = ".") -> None:
 
             base_name = os.path.splitext(filename)[0]
             output_file = os.path.join(output_dir, f"{base_name}_extracted.txt")
-            try:
-                with open(output_file, "w", encoding="utf-8") as out_file:
-                    out_file.write(extracted_text)
-                print(f"Saved extracted text to: {output_file}\n")
-            except Exception as e:
-                print(f"Error saving output for '{input_file_path}': {e}")
+            tasks.append((input_file_path, kind, output_file))
+
+    with concurrent.futures.ProcessPoolExecutor() as executor:
+        list(executor.map(_extract_one, tasks))
 
 if __name__ == '__main__':
     # Optionally, allow specifying a root directory as a command-line argument.
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import torch
+import comparison
+
+
+@pytest.mark.skipif(comparison.DEVICE == "cuda", reason="the worker pool is only used on CPU-only hosts")
+def test_encode_clauses_multi_process_above_threshold():
+    """
+    Encodes enough unique clauses to go through the CPU worker pool with the
+    int8-quantized model, and checks the result against in-process encoding.
+    """
+    model = comparison.get_model()
+    clauses = [
+        f"Clause {i}: the operator shall record reading number {i} in the shift log."
+        for i in range(comparison._MULTI_PROCESS_MIN_CLAUSES)
+    ]
+    # A duplicate checks that the index map expands results back correctly
+    clauses.append(clauses[0])
+
+    embeddings = comparison.encode_clauses(model, clauses, multi_process=True)
+
+    assert embeddings.shape == (len(clauses), model.get_sentence_embedding_dimension())
+    assert torch.equal(embeddings[0], embeddings[-1])
+
+    # Dynamic quantization scales activations per batch, so results only
+    # match in-process encoding closely rather than exactly
+    in_process = comparison.encode_text(model, clauses[:8], is_multiple_texts=True)
+    similarity = (embeddings[:8].float() * in_process.float()).sum(dim=-1)
+    assert torch.all(similarity > 0.99)